@@ -0,0 +1,45 @@
+"""add post signatures for duplicate detection
+
+Revision ID: 6f2d9c41a7b3
+Revises:
+Create Date: 2026-10-19 17:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from app import dedup
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f2d9c41a7b3'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = [sa.Column("content_hash", sa.String(64))] + [
+    sa.Column(f"lsh_band_{band}", sa.Integer) for band in range(dedup.BANDS)
+]
+
+
+def upgrade() -> None:
+    # Databases created after this change already have the columns from create_all().
+    existing = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("posts")}
+    indexes = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("posts")}
+    for column in COLUMNS:
+        if column.name not in existing:
+            op.add_column("posts", column)
+        index = f"ix_posts_social_media_{column.name}"
+        if index not in indexes:
+            op.create_index(index, "posts", ["social_media_id", column.name])
+    # Sign existing posts so they can be matched as duplicates.
+    dedup.backfill(Session(bind=op.get_bind()))
+
+
+def downgrade() -> None:
+    for column in COLUMNS:
+        op.drop_index(f"ix_posts_social_media_{column.name}", table_name="posts")
+        op.drop_column("posts", column.name)
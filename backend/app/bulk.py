@@ -0,0 +1,97 @@
+import csv
+import enum
+import io
+import json
+from datetime import datetime
+from itertools import islice
+from sqlalchemy import insert, text
+BATCH_SIZE = 2000
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+# backend_v2 exports the same data under other names and values; ``translate`` maps them
+# so its exports import here.
+FOREIGN_FIELDS = {"type": "platform", "scheduled_for": "scheduled_time", "published_at": "published_time"}
+FOREIGN_VALUES = {
+    "platform": {"FB": "facebook", "IG": "instagram", "TW": "twitter", "TH": "threads", "LI": "linkedin", "TT": "tiktok"},
+}
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+def export_rows(rows, fields, fmt, batch_size=BATCH_SIZE):
+    """Yield rows as NDJSON or CSV text, one chunk per ``batch_size`` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer:
+        writer.writerow(fields)
+    for i, row in enumerate(rows, 1):
+        values = [_encode(getattr(row, field)) for field in fields]
+        if writer:
+            writer.writerow(values)
+        else:
+            buffer.write(json.dumps(dict(zip(fields, values))))
+            buffer.write("\n")
+        if i % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+def read_rows(fileobj, fmt):
+    """Parse an uploaded NDJSON or CSV file into dicts, one line at a time."""
+    stream = io.TextIOWrapper(fileobj, encoding="utf-8", newline="")
+    if fmt == "csv":
+        for record in csv.DictReader(stream):
+            yield {key: (value if value != "" else None) for key, value in record.items()}
+    else:
+        for line in stream:
+            if line.strip():
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError(f"Expected a JSON object per line, got {type(record).__name__}")
+                yield record
+def translate(record):
+    """Rename backend_v2's fields and values in ``record`` to ours."""
+    record = {FOREIGN_FIELDS.get(key, key): value for key, value in record.items()}
+    for name, values in FOREIGN_VALUES.items():
+        if record.get(name) in values:
+            record[name] = values[record[name]]
+    return record
+def coerce(table, fields, record):
+    """Convert a parsed record to column values, leaving out keys the database should fill in."""
+    unknown = record.keys() - set(fields)
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    values = {}
+    for name in fields:
+        column = table.columns[name]
+        value = record.get(name)
+        if value is None:
+            if column.primary_key or column.server_default is not None:
+                continue
+        elif column.type.python_type is datetime:
+            value = datetime.fromisoformat(value) if isinstance(value, str) else value
+        elif not isinstance(value, column.type.python_type):
+            value = column.type.python_type(value)
+        values[name] = value
+    return values
+def import_rows(db, table, fields, records, batch_size=BATCH_SIZE):
+    """Insert records with one executemany per batch; the caller commits or rolls back."""
+    count = 0
+    explicit_ids = False
+    records = iter(records)
+    while batch := list(islice(records, batch_size)):
+        groups = {}
+        for record in batch:
+            values = coerce(table, fields, record)
+            groups.setdefault(tuple(values), []).append(values)
+        for params in groups.values():
+            explicit_ids = explicit_ids or "id" in params[0]
+            db.execute(insert(table), params)
+        count += len(batch)
+    if explicit_ids and db.get_bind().dialect.name == "postgresql":
+        # Rows restored with their original ids leave the sequence behind.
+        db.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), (SELECT MAX(id) FROM {table.name}))"
+        ))
+    return count
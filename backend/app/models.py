@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum as SQLEnum, DateTime, Table
+from sqlalchemy import Column, Integer, String, ForeignKey, Enum as SQLEnum, DateTime, Table, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -71,6 +71,19 @@ class Post(Base):
     published_time = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Duplicate detection signature, see app/dedup.py
+    content_hash = Column(String(64))
+    lsh_band_0 = Column(Integer)
+    lsh_band_1 = Column(Integer)
+    lsh_band_2 = Column(Integer)
+    lsh_band_3 = Column(Integer)
     # Relationships
     social_media = relationship("SocialMedia", back_populates="posts")
-    author = relationship("User", back_populates="posts")
\ No newline at end of file
+    author = relationship("User", back_populates="posts")
+    __table_args__ = (
+        Index("ix_posts_social_media_content_hash", "social_media_id", "content_hash"),
+        Index("ix_posts_social_media_lsh_band_0", "social_media_id", "lsh_band_0"),
+        Index("ix_posts_social_media_lsh_band_1", "social_media_id", "lsh_band_1"),
+        Index("ix_posts_social_media_lsh_band_2", "social_media_id", "lsh_band_2"),
+        Index("ix_posts_social_media_lsh_band_3", "social_media_id", "lsh_band_3"),
+    )
\ No newline at end of file
@@ -1,9 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal
 from ..database import get_db
-from .. import models, schemas
+from .. import bulk, dedup, models, schemas
 router = APIRouter()
+EXPORT_FIELDS = {
+    "posts": (models.Post, ["id", "content", "social_media_id", "author_id", "status",
+                            "scheduled_time", "published_time", "created_at"]),
+    "social-media": (models.SocialMedia, ["id", "platform", "account_name", "access_token",
+                                          "user_id", "organization_id", "created_at"]),
+}
 @router.post("/", response_model=schemas.Organization)
 def create_organization(
         organization: schemas.OrganizationCreate,
@@ -27,4 +35,70 @@ def read_organization(org_id: int, db: Session = Depends(get_db)):
     db_org = db.query(models.Organization).filter(models.Organization.id == org_id).first()
     if db_org is None:
         raise HTTPException(status_code=404, detail="Organization not found")
-    return db_org
\ No newline at end of file
+    return db_org
+def get_organization_or_404(db: Session, org_id: int):
+    db_org = db.query(models.Organization).filter(models.Organization.id == org_id).first()
+    if db_org is None:
+        raise HTTPException(status_code=404, detail="Organization not found")
+    return db_org
+@router.get("/{org_id}/export/{resource}")
+def export_organization_data(
+        org_id: int,
+        resource: Literal["posts", "social-media"],
+        file_format: Literal["ndjson", "csv"] = "ndjson",
+        db: Session = Depends(get_db)
+):
+    get_organization_or_404(db, org_id)
+    model, fields = EXPORT_FIELDS[resource]
+    query = db.query(*[getattr(model, field) for field in fields])
+    if model is models.Post:
+        query = query.join(models.SocialMedia)
+    # yield_per streams through a server-side cursor instead of loading the whole org.
+    rows = query.filter(models.SocialMedia.organization_id == org_id).order_by(model.id).yield_per(bulk.BATCH_SIZE)
+    return StreamingResponse(
+        bulk.export_rows(rows, fields, file_format),
+        media_type=bulk.MEDIA_TYPES[file_format],
+        headers={"Content-Disposition": f'attachment; filename="organization-{org_id}-{resource}.{file_format}"'}
+    )
+@router.post("/{org_id}/import/{resource}")
+def import_organization_data(
+        org_id: int,
+        resource: Literal["posts", "social-media"],
+        file: UploadFile = File(...),
+        file_format: Literal["ndjson", "csv"] = "ndjson",
+        db: Session = Depends(get_db),
+        current_user_id: int = 1  # TODO: Replace with actual auth
+):
+    get_organization_or_404(db, org_id)
+    model, fields = EXPORT_FIELDS[resource]
+    if model is models.Post:
+        fields = fields + dedup.SIGNATURE_FIELDS
+    account_ids = {
+        account_id for (account_id,) in
+        db.query(models.SocialMedia.id).filter(models.SocialMedia.organization_id == org_id)
+    }
+    def prepare(records):
+        for record in records:
+            record = bulk.translate(record)
+            if model is models.Post:
+                if int(record.get("social_media_id") or 0) not in account_ids:
+                    raise ValueError(f"Social media account {record.get('social_media_id')} is not part of this organization")
+                record["author_id"] = record.get("author_id") or current_user_id
+                if not record.get("status"):
+                    # backend_v2 has no status column; it follows from the timestamps.
+                    record["status"] = "published" if record.get("published_time") else "scheduled" if record.get("scheduled_time") else "draft"
+                record.update(dedup.signature(record.get("content") or ""))
+            else:
+                record["organization_id"] = org_id
+                record["user_id"] = record.get("user_id") or current_user_id
+            yield record
+    try:
+        count = bulk.import_rows(db, model.__table__, fields, prepare(bulk.read_rows(file.file, file_format)))
+        db.commit()
+    except (ValueError, TypeError) as exc:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(exc))
+    except IntegrityError as exc:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(exc.orig))
+    return {"imported": count}
@@ -2,16 +2,31 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from ..database import get_db
-from .. import models, schemas
+from .. import dedup, models, schemas
 router = APIRouter()
 @router.post("/", response_model=schemas.Post)
 def create_post(
         post: schemas.PostCreate,
+        allow_duplicate: bool = False,
         db: Session = Depends(get_db),
         current_user_id: int = 1  # TODO: Replace with actual auth
 ):
+    signature = dedup.signature(post.content)
+    if not allow_duplicate:
+        # Best effort: concurrent creates of the same post can both get past this check.
+        duplicate = dedup.find_duplicate(db, post.social_media_id, post.content, signature)
+        if duplicate is not None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={
+                    "message": "A similar post already exists for this social media account",
+                    "duplicate_of": duplicate[0].id,
+                    "similarity": round(duplicate[1], 3),
+                }
+            )
     db_post = models.Post(
         **post.dict(),
+        **signature,
         author_id=current_user_id,
         status="draft"
     )
@@ -1,5 +1,6 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from app import database
 from app.database import engine
 from app.models import Base
 from app.routers import users, organizations, posts, social_media
@@ -14,6 +15,21 @@ app.add_middleware(
 
 Base.metadata.create_all(bind=engine)
 
+@app.middleware("http")
+async def route_database_reads(request: Request, call_next):
+    # Safe requests may read from a replica unless this client wrote within REPLICA_STICKY_SECONDS.
+    state = database.RoutingState(
+        use_replica=request.method in database.SAFE_METHODS and database.PRIMARY_COOKIE not in request.cookies
+    )
+    token = database.routing_state.set(state)
+    try:
+        response = await call_next(request)
+    finally:
+        database.routing_state.reset(token)
+    if state.wrote:
+        response.set_cookie(database.PRIMARY_COOKIE, "1", max_age=database.REPLICA_STICKY_SECONDS, httponly=True)
+    return response
+
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(organizations.router, prefix="/api/organizations", tags=["organizations"])
 app.include_router(posts.router, prefix="/api/posts", tags=["posts"])
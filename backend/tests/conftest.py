@@ -0,0 +1,10 @@
+# The app reads its database URLs at import: point them at scratch SQLite files, a primary
+# and one replica, before any test module imports it.
+# Run from backend/ with: python -m pytest tests (needs pytest and httpx<0.28 for TestClient)
+import os
+import sys
+import tempfile
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/primary.db"
+os.environ["DATABASE_REPLICA_URLS"] = f"sqlite:///{_tmp}/replica.db"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,89 @@
+import json
+from datetime import datetime
+import pytest
+from fastapi.testclient import TestClient
+from app import database, models
+from app.database import SessionLocal
+from main import app
+client = TestClient(app)
+POST_COLUMNS = ["id", "content", "social_media_id", "author_id", "status", "scheduled_time", "published_time", "created_at"]
+@pytest.fixture(autouse=True)
+def organization(monkeypatch):
+    monkeypatch.setattr(database, "replicas", [])
+    db = SessionLocal()
+    for model in (models.Post, models.SocialMedia, models.Organization, models.User):
+        db.query(model).delete()
+    db.add(models.User(id=1, email="owner@example.com", full_name="Owner"))
+    db.add_all([models.Organization(id=1, name="Acme", owner_id=1), models.Organization(id=2, name="Other", owner_id=1)])
+    db.add_all([
+        models.SocialMedia(id=1, platform=models.SocialMediaType.TWITTER, account_name="acme", access_token="token",
+                           user_id=1, organization_id=1),
+        models.SocialMedia(id=2, platform=models.SocialMediaType.LINKEDIN, account_name="other", access_token="token",
+                           user_id=1, organization_id=2),
+    ])
+    db.commit()
+    yield db
+    db.close()
+def create_posts(db):
+    created_at = datetime(2020, 1, 1, 12, 0, 0, 123456)
+    db.add(models.Post(content="Plain post", social_media_id=1, author_id=1, status="draft", created_at=created_at))
+    db.add(models.Post(content='Comma, "quotes"\nand a newline', social_media_id=1, author_id=1, status="published",
+                       scheduled_time=datetime(2020, 3, 4, 5, 6, 7, 508906), published_time=datetime(2020, 3, 4, 5, 6, 8),
+                       created_at=created_at))
+    db.commit()
+def rows(db):
+    db.expire_all()
+    return [tuple(getattr(post, column) for column in POST_COLUMNS) for post in db.query(models.Post).order_by(models.Post.id)]
+def export(resource, file_format="ndjson"):
+    response = client.get(f"/api/organizations/1/export/{resource}", params={"file_format": file_format})
+    assert response.status_code == 200
+    return response.content
+def upload(resource, content, file_format="ndjson"):
+    return client.post(f"/api/organizations/1/import/{resource}", params={"file_format": file_format},
+                       files={"file": (f"{resource}.{file_format}", content)})
+@pytest.mark.parametrize("file_format", ["ndjson", "csv"])
+def test_round_trip(organization, file_format):
+    create_posts(organization)
+    before = rows(organization)
+    exported = export("posts", file_format)
+    organization.query(models.Post).delete()
+    organization.commit()
+    response = upload("posts", exported, file_format)
+    assert response.status_code == 200, response.text
+    assert response.json() == {"imported": 2}
+    assert rows(organization) == before
+    assert organization.query(models.Post).filter(models.Post.content_hash.is_(None)).count() == 0
+def test_ndjson_keeps_microseconds(organization):
+    create_posts(organization)
+    records = [json.loads(line) for line in export("posts").splitlines()]
+    assert records[1]["scheduled_time"] == "2020-03-04T05:06:07.508906"
+    assert records[0]["created_at"] == "2020-01-01T12:00:00.123456"
+def test_id_conflict(organization):
+    create_posts(organization)
+    assert upload("posts", export("posts")).status_code == 409
+    assert organization.query(models.Post).count() == 2
+def test_account_of_another_organization_is_rejected(organization):
+    response = upload("posts", json.dumps({"social_media_id": 2, "content": "Not yours"}).encode())
+    assert response.status_code == 400
+    assert organization.query(models.Post).count() == 0
+def test_backend_v2_export_is_translated(organization):
+    # Field names and values as written by backend_v2.
+    account = {"id": 100, "organization_id": 7, "type": "TW", "account_name": "moved", "access_token": "token",
+               "created_at": "2021-05-06T07:08:09.100000"}
+    post = {"id": 200, "social_media_id": 100, "content": "Moved post", "created_at": "2021-05-06T07:08:09",
+            "scheduled_for": "2030-01-01T00:00:00", "published_at": None}
+    assert upload("social-media", json.dumps(account).encode()).status_code == 200
+    assert upload("posts", json.dumps(post).encode()).status_code == 200
+    account = organization.get(models.SocialMedia, 100)
+    assert (account.platform, account.organization_id) == (models.SocialMediaType.TWITTER, 1)
+    post = organization.get(models.Post, 200)
+    assert (post.status, post.scheduled_time) == ("scheduled", datetime(2030, 1, 1))
+@pytest.mark.parametrize("record, message", [
+    ({"platform": "myspace", "account_name": "new"}, "myspace"),
+    ({"platform": "twitter", "followers": 10}, "Unknown field(s): followers"),
+])
+def test_invalid_records_are_rejected(organization, record, message):
+    response = upload("social-media", json.dumps(record).encode())
+    assert response.status_code == 400
+    assert message in response.json()["detail"]
+    assert organization.query(models.SocialMedia).count() == 2
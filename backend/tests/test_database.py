@@ -0,0 +1,49 @@
+# Replica routing against two SQLite files, one standing in for the primary and one for a replica.
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app import database, models
+from main import app
+replica = database.replicas[0]
+client = TestClient(app)
+@pytest.fixture(autouse=True)
+def databases():
+    models.Base.metadata.create_all(bind=replica.engine)
+    for engine, name in ((database.engine, "primary"), (replica.engine, "replica")):
+        with engine.begin() as conn:
+            conn.execute(models.Organization.__table__.delete())
+            conn.execute(models.Organization.__table__.insert(), {"name": name, "owner_id": 1})
+    replica.lag = 0.0
+    replica.checked_at = 0.0
+    client.cookies.clear()
+def names(response):
+    assert response.status_code == 200
+    return sorted(org["name"] for org in response.json())
+def test_get_reads_from_replica():
+    assert names(client.get("/api/organizations/")) == ["replica"]
+def test_write_pins_session_to_primary():
+    db = database.SessionLocal(use_replica=True)
+    try:
+        assert sorted(name for name, in db.query(models.Organization.name)) == ["replica"]
+        db.add(models.Organization(name="new", owner_id=1))
+        db.commit()
+        assert sorted(name for name, in db.query(models.Organization.name)) == ["new", "primary"]
+    finally:
+        db.close()
+def test_write_sets_sticky_cookie():
+    response = client.post("/api/organizations/", json={"name": "new"})
+    assert response.status_code == 200
+    assert database.PRIMARY_COOKIE in response.cookies
+    assert f"Max-Age={database.REPLICA_STICKY_SECONDS}" in response.headers["set-cookie"]
+    assert names(client.get("/api/organizations/")) == ["new", "primary"]
+    client.cookies.clear()
+    assert names(client.get("/api/organizations/")) == ["replica"]
+def test_lagging_replica_is_skipped():
+    replica.lag = float("inf")
+    replica.checked_at = time.monotonic()
+    assert names(client.get("/api/organizations/")) == ["primary"]
+def test_unreachable_replica_is_skipped(monkeypatch, tmp_path):
+    unreachable = database.Replica(f"sqlite:///{tmp_path}/missing/replica.db")
+    monkeypatch.setattr(database, "replicas", [unreachable])
+    assert names(client.get("/api/organizations/")) == ["primary"]
+    assert unreachable.lag == float("inf")
@@ -0,0 +1,55 @@
+import pytest
+from fastapi.testclient import TestClient
+from app import database, dedup, models
+from app.database import SessionLocal
+from main import app
+client = TestClient(app)
+SALE = "Our spring sale starts Monday with thirty percent off every jacket and boot in the store"
+WEBINAR = "Join our webinar on cloud security best practices next Thursday at noon"
+@pytest.fixture(autouse=True)
+def db(monkeypatch):
+    monkeypatch.setattr(database, "replicas", [])
+    db = SessionLocal()
+    db.query(models.Post).delete()
+    db.commit()
+    yield db
+    db.close()
+def create(content, social_media_id=1, allow_duplicate=False):
+    return client.post("/api/posts/", params={"allow_duplicate": allow_duplicate},
+                       json={"content": content, "social_media_id": social_media_id, "scheduled_time": None})
+def test_exact_duplicate_after_normalization():
+    original = create(SALE).json()["id"]
+    response = create("  OUR spring-sale starts Monday, with thirty percent off every jacket and boot in the store!! ")
+    assert response.status_code == 409
+    assert response.json()["detail"]["duplicate_of"] == original
+    assert response.json()["detail"]["similarity"] == 1.0
+def test_near_duplicate():
+    original = create(SALE).json()["id"]
+    edited = SALE.replace("Monday", "Tuesday")
+    assert dedup.similarity(SALE, edited) >= dedup.NEAR_DUPLICATE_THRESHOLD
+    response = create(edited)
+    assert response.status_code == 409
+    assert response.json()["detail"]["duplicate_of"] == original
+    assert response.json()["detail"]["similarity"] < 1.0
+def test_unrelated_post():
+    create(SALE)
+    assert create(WEBINAR).status_code == 200
+def test_other_account_is_not_a_duplicate():
+    create(SALE)
+    assert create(SALE, social_media_id=2).status_code == 200
+def test_allow_duplicate(db):
+    create(SALE)
+    assert create(SALE, allow_duplicate=True).status_code == 200
+    assert db.query(models.Post).count() == 2
+def test_empty_content_is_never_a_duplicate(db):
+    assert create("!!!").status_code == 200
+    assert create("???").status_code == 200
+    assert dedup.find_duplicate(db, 1, "", dedup.signature("")) is None
+def test_backfill_signs_old_posts(db):
+    db.add_all([models.Post(content=SALE, social_media_id=1), models.Post(content=None, social_media_id=1)])
+    db.commit()
+    assert dedup.backfill(db, batch_size=1) == 2
+    assert dedup.backfill(db) == 0
+    post = db.query(models.Post).filter(models.Post.content == SALE).one()
+    assert {field: getattr(post, field) for field in dedup.SIGNATURE_FIELDS} == dedup.signature(SALE)
+    assert create(SALE).status_code == 409
@@ -0,0 +1,133 @@
+import codecs
+import csv
+import io
+import json
+from datetime import datetime
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import connection
+
+BATCH_SIZE = 2000
+CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+# The FastAPI backend (backend/) exports the same data under other names and values;
+# ``translate`` maps them so its exports import here. Its columns we have no place for
+# (the post author and status, the account owner) are dropped.
+FOREIGN_FIELDS = {'platform': 'type', 'scheduled_time': 'scheduled_for', 'published_time': 'published_at'}
+FOREIGN_VALUES = {
+    'type': {'facebook': 'FB', 'instagram': 'IG', 'twitter': 'TW', 'threads': 'TH', 'linkedin': 'LI', 'tiktok': 'TT'},
+}
+DROPPED_FIELDS = {'author_id', 'status', 'user_id'}
+
+
+def _encode(value):
+    # isoformat keeps microseconds; DjangoJSONEncoder would cut them to milliseconds.
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def export_rows(rows, fields, file_format, batch_size=BATCH_SIZE):
+    """Yield ``values_list`` rows as NDJSON or CSV text, one chunk per ``batch_size`` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if file_format == 'csv' else None
+    if writer:
+        writer.writerow(fields)
+    for i, row in enumerate(rows, 1):
+        values = [_encode(value) for value in row]
+        if writer:
+            writer.writerow(values)
+        else:
+            buffer.write(json.dumps(dict(zip(fields, values))))
+            buffer.write('\n')
+        if i % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def read_rows(uploaded, file_format):
+    """Parse an uploaded NDJSON or CSV file into dicts without reading it all into memory."""
+    lines = codecs.iterdecode(uploaded, 'utf-8')
+    if file_format == 'csv':
+        yield from csv.DictReader(lines)
+    else:
+        for line in lines:
+            if line.strip():
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError(f'Expected a JSON object per line, got {type(record).__name__}')
+                yield record
+
+
+def translate(record):
+    """Rename the FastAPI backend's fields and values in ``record`` to ours."""
+    record = {FOREIGN_FIELDS.get(key, key): value for key, value in record.items() if key not in DROPPED_FIELDS}
+    for name, values in FOREIGN_VALUES.items():
+        if record.get(name) in values:
+            record[name] = values[record[name]]
+    return record
+
+
+def build(model, fields, record):
+    """Validate ``record`` against ``fields`` and return an unsaved instance.
+
+    Unknown keys, missing required fields and invalid values (including values outside
+    a field's choices) raise ``ValueError`` rather than being skipped or stored as is.
+    """
+    unknown = record.keys() - set(fields)
+    if unknown:
+        raise ValueError(f'Unknown field(s): {", ".join(sorted(unknown))}')
+    values = {}
+    for name in fields:
+        field = model._meta.get_field(name)
+        value = record.get(name)
+        # CSV has no null, so empty cells of nullable columns are read back as None.
+        if value == '' and (field.null or field.primary_key):
+            value = None
+        if value is None:
+            if not (field.null or field.primary_key or field.has_default() or getattr(field, 'auto_now_add', False)):
+                raise ValueError(f'Missing required field {name!r}')
+            continue
+        try:
+            # Relations are only converted: their existence is checked by the database.
+            values[field.attname] = field.to_python(value) if field.is_relation else field.clean(value, None)
+        except ValidationError as exc:
+            raise ValueError(f'{name}: {" ".join(exc.messages)}') from exc
+    return model(**values)
+
+
+def import_rows(model, fields, records, batch_size=BATCH_SIZE, on_batch=None):
+    """``bulk_create`` records in batches; call inside ``transaction.atomic()``.
+
+    ``on_batch`` is called with each batch of saved instances.
+    """
+    count = 0
+    explicit_ids = False
+    # bulk_create overwrites auto_now_add fields with now; the imported values are put
+    # back with a bulk_update per batch so restored rows keep their history.
+    auto_now_fields = [name for name in fields if getattr(model._meta.get_field(name), 'auto_now_add', False)]
+    records = iter(records)
+    while batch := list(islice(records, batch_size)):
+        objs = [build(model, fields, record) for record in batch]
+        explicit_ids = explicit_ids or any(obj.pk is not None for obj in objs)
+        imported = [[getattr(obj, name) for name in auto_now_fields] for obj in objs]
+        model.objects.bulk_create(objs, batch_size=batch_size)
+        restored = []
+        for obj, values in zip(objs, imported):
+            if obj.pk is not None and any(value is not None for value in values):
+                for name, value in zip(auto_now_fields, values):
+                    if value is not None:
+                        setattr(obj, name, value)
+                restored.append(obj)
+        if restored:
+            model.objects.bulk_update(restored, auto_now_fields, batch_size=batch_size)
+        if on_batch is not None:
+            on_batch(objs)
+        count += len(objs)
+    if explicit_ids:
+        # Rows restored with their original ids leave the sequence behind.
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+                cursor.execute(sql)
+    return count
@@ -0,0 +1,84 @@
+import hashlib
+import random
+import re
+import unicodedata
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Post
+
+
+# MinHash signatures are split into BANDS bands of ROWS values (LSH); two posts become
+# candidates when any band matches, and candidates are confirmed with exact Jaccard.
+# Shingles are character 3-grams: a one-word edit in a 15-word post still scores ~0.9,
+# but in posts shorter than ~25 characters a single edit can fall below the threshold.
+BANDS = 4
+ROWS = 3
+SIGNATURE_FIELDS = ['content_hash'] + [f'lsh_band_{band}' for band in range(BANDS)]
+NEAR_DUPLICATE_THRESHOLD = 0.8
+SHINGLE_SIZE = 3
+WINDOW = timedelta(days=90)
+MAX_CANDIDATES = 50
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x5057)  # fixed seed: stored signatures must stay comparable across processes
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(_PRIME)) for _ in range(BANDS * ROWS)]
+_WORD = re.compile(r'\w+')
+
+
+def normalize(content):
+    return ' '.join(_WORD.findall(unicodedata.normalize('NFKC', content).casefold()))
+
+
+def shingles(normalized):
+    if len(normalized) < SHINGLE_SIZE:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+
+def similarity(a, b):
+    a, b = shingles(normalize(a)), shingles(normalize(b))
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def signature(content):
+    normalized = normalize(content)
+    values = [
+        int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'big')
+        for shingle in shingles(normalized)
+    ] or [0]
+    minhashes = [min((a * x + b) % _PRIME for x in values) for a, b in _PERMUTATIONS]
+    fields = {'content_hash': hashlib.sha256(normalized.encode()).hexdigest()}
+    for band in range(BANDS):
+        key = repr(minhashes[band * ROWS:(band + 1) * ROWS]).encode()
+        fields[f'lsh_band_{band}'] = int.from_bytes(hashlib.blake2b(key, digest_size=4).digest(), 'big', signed=True)
+    return fields
+
+
+def find_duplicate(social_media, content, fields):
+    """Return ``(post, similarity)`` for the closest recent post on the account, or ``None``.
+
+    This is a check before the insert, not a constraint: two identical posts created at
+    the same moment can both pass it.
+    """
+    normalized = normalize(content)
+    if not normalized:
+        # Empty or punctuation-only posts all share one hash; there is nothing to compare.
+        return None
+    # One (social_media, signature column) pair per OR branch so each branch hits its own index.
+    matches = Q()
+    for field in SIGNATURE_FIELDS:
+        matches |= Q(social_media=social_media, **{field: fields[field]})
+    candidates = Post.objects.filter(matches, created_at__gte=timezone.now() - WINDOW).order_by('-pk')[:MAX_CANDIDATES]
+    best = None
+    for post in candidates:
+        # A hash match is only trusted if the stored content still normalizes the same.
+        score = 1.0 if normalize(post.content or '') == normalized else similarity(content, post.content)
+        if score >= NEAR_DUPLICATE_THRESHOLD and (best is None or score > best[1]):
+            best = (post, score)
+            if score == 1.0:
+                break
+    return best
@@ -0,0 +1,233 @@
+import base64
+import hashlib
+import http.client
+import ipaddress
+import logging
+import re
+import socket
+import urllib.error
+import urllib.request
+from datetime import timedelta
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Link
+
+URL_RE = re.compile(r'https?://[^\s<>"\']+')
+TRAILING_PUNCTUATION = '.,;:!?)]}\'"'
+BRACKETS = {')': '(', ']': '[', '}': '{'}
+MAX_BYTES = 512 * 1024
+USER_AGENT = 'PostflyrBot/1.0 (+link preview)'
+
+logger = logging.getLogger(__name__)
+
+
+class LinkError(Exception):
+    pass
+
+
+def strip_trailing(url):
+    # Punctuation after a URL usually ends the sentence. A closing bracket is kept when the
+    # URL opened it, as in https://en.wikipedia.org/wiki/Foo_(bar).
+    while url and url[-1] in TRAILING_PUNCTUATION:
+        opening = BRACKETS.get(url[-1])
+        if opening is not None and url.count(opening) >= url.count(url[-1]):
+            break
+        url = url[:-1]
+    return url
+
+
+def extract_urls(content):
+    return [strip_trailing(match.group()) for match in URL_RE.finditer(content)]
+
+
+def normalize_url(url):
+    # The fragment stays: the short link must redirect to the exact URL it replaced.
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', parts.query, parts.fragment))
+
+
+def url_hash(url):
+    return hashlib.sha256(normalize_url(url).encode()).hexdigest()
+
+
+def short_code(digest):
+    return base64.urlsafe_b64encode(bytes.fromhex(digest)[:6]).decode()
+
+
+def short_url(code):
+    if not settings.SHORT_LINK_BASE_URL:
+        return None
+    return settings.SHORT_LINK_BASE_URL + code
+
+
+def links_for(content):
+    """Return the cached ``Link`` rows for every URL in ``content``, creating missing ones.
+
+    No network access: new rows start unresolved and ``resolve`` fills them in later.
+    """
+    urls = {url_hash(url): normalize_url(url) for url in extract_urls(content)}
+    if not urls:
+        return []
+    Link.objects.bulk_create(
+        [Link(url_hash=digest, url=url, short_code=short_code(digest)) for digest, url in urls.items()],
+        ignore_conflicts=True,
+    )
+    return list(Link.objects.filter(url_hash__in=urls))
+
+
+def needs_refresh(link):
+    return link.expires_at is None or link.expires_at <= timezone.now()
+
+
+def shorten(content):
+    """Replace URLs that have a ``Link`` row with their short links, using the cache only.
+
+    Without a ``SHORT_LINK_BASE_URL`` the content is returned unchanged.
+    """
+    urls = extract_urls(content)
+    if not urls or not settings.SHORT_LINK_BASE_URL:
+        return content
+    codes = dict(Link.objects.filter(url_hash__in=[url_hash(url) for url in urls]).values_list('url_hash', 'short_code'))
+    for url in sorted(set(urls), key=len, reverse=True):
+        code = codes.get(url_hash(url))
+        if code is not None:
+            content = content.replace(url, short_url(code))
+    return content
+
+
+class OpenGraphParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.meta = {}
+        self.title = ''
+        self.in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'meta':
+            attrs = dict(attrs)
+            key = attrs.get('property') or attrs.get('name')
+            if key and attrs.get('content'):
+                self.meta.setdefault(key.lower(), attrs['content'].strip())
+        elif tag == 'title':
+            self.in_title = True
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self.in_title = False
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title += data
+
+
+def public_connection(address, timeout=None, source_address=None):
+    """``socket.create_connection`` that refuses non-public addresses.
+
+    The addresses are checked and connected to in one step, so a DNS answer that changes
+    between check and connect (rebinding) can't reach our own network. Every hop of a
+    redirect goes through here too.
+    """
+    host, port = address
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as exc:
+        raise LinkError(f'Cannot resolve {host}') from exc
+    addresses = [info[4][0] for info in infos]
+    if not settings.LINK_FETCH_ALLOW_PRIVATE:
+        for address in addresses:
+            if not ipaddress.ip_address(address.split('%')[0]).is_global:
+                raise LinkError(f'{host} resolves to a non-public address')
+    error = None
+    for address in addresses:
+        try:
+            return socket.create_connection((address, port), timeout, source_address)
+        except OSError as exc:
+            error = exc
+    raise error
+
+
+class PublicHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = public_connection
+
+
+class PublicHTTPSConnection(http.client.HTTPSConnection):
+    # TLS still verifies and sends SNI for the hostname, only the TCP connect is pinned.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = public_connection
+
+
+class PublicHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(PublicHTTPConnection, req)
+
+
+class PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(PublicHTTPSConnection, req, context=self._context)
+
+
+# No ProxyHandler: a proxy would make the connection (and the address check) to the proxy.
+opener = urllib.request.build_opener(urllib.request.ProxyHandler({}), PublicHTTPHandler, PublicHTTPSHandler)
+
+
+def fetch_preview(url):
+    request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT, 'Accept': 'text/html'})
+    try:
+        with opener.open(request, timeout=settings.LINK_FETCH_TIMEOUT) as response:
+            final_url = response.geturl()
+            if response.headers.get_content_type() != 'text/html':
+                return {'final_url': final_url}
+            html = response.read(MAX_BYTES).decode(response.headers.get_content_charset() or 'utf-8', errors='replace')
+    except urllib.error.HTTPError as exc:
+        raise LinkError(f'HTTP {exc.code}') from exc
+    except LookupError as exc:
+        raise LinkError('Unknown charset') from exc
+    except (urllib.error.URLError, http.client.HTTPException, OSError, ValueError) as exc:
+        raise LinkError(str(getattr(exc, 'reason', exc)).strip() or type(exc).__name__) from exc
+    parser = OpenGraphParser()
+    parser.feed(html)
+    meta = parser.meta
+    image = urljoin(final_url, meta.get('og:image') or meta.get('twitter:image') or '')
+    return {
+        'final_url': final_url[:2048],
+        'title': (meta.get('og:title') or meta.get('twitter:title') or parser.title.strip())[:512],
+        'description': meta.get('og:description') or meta.get('twitter:description') or meta.get('description') or '',
+        'image': image[:2048] if image != final_url else '',
+        'site_name': meta.get('og:site_name', '')[:255],
+    }
+
+
+def resolve(link):
+    """Fetch and cache the preview for ``link`` unless a fresh (or negative) entry exists.
+
+    The row is claimed with a conditional UPDATE first, so concurrent lookups of the same
+    URL from other threads or worker processes skip the fetch instead of repeating it.
+    """
+    now = timezone.now()
+    claimed = Link.objects.filter(Q(expires_at__isnull=True) | Q(expires_at__lte=now), pk=link.pk).update(
+        expires_at=now + timedelta(seconds=settings.LINK_FETCH_TIMEOUT * 3)
+    )
+    if not claimed:
+        return False
+    try:
+        fields = {'error': '', **fetch_preview(link.url)}
+        ttl = settings.LINK_PREVIEW_TTL
+    except LinkError as exc:
+        fields = {'error': str(exc)[:255]}
+        ttl = settings.LINK_ERROR_TTL
+    except Exception as exc:
+        # Anything else is still this URL's failure: cache it rather than failing the whole job.
+        logger.exception('Preview of %s failed', link.url)
+        fields = {'error': (str(exc) or type(exc).__name__)[:255]}
+        ttl = settings.LINK_ERROR_TTL
+    now = timezone.now()
+    Link.objects.filter(pk=link.pk).update(**fields, fetched_at=now, expires_at=now + timedelta(seconds=ttl))
+    return True
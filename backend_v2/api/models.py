@@ -25,9 +25,41 @@ class SocialMedia(models.Model):
     access_token = models.CharField(max_length=512)
     created_at = models.DateTimeField(auto_now_add=True)
 
+class Link(models.Model):
+    # Shared, content-addressed cache of link previews and short links, see api/links.py
+    url_hash = models.CharField(max_length=64, unique=True)
+    url = models.URLField(max_length=2048)
+    short_code = models.CharField(max_length=16, unique=True)
+    final_url = models.URLField(max_length=2048, blank=True)
+    title = models.CharField(max_length=512, blank=True)
+    description = models.TextField(blank=True)
+    image = models.URLField(max_length=2048, blank=True)
+    site_name = models.CharField(max_length=255, blank=True)
+    error = models.CharField(max_length=255, blank=True)
+    clicks = models.PositiveIntegerField(default=0)
+    fetched_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
 class Post(models.Model):
     social_media = models.ForeignKey(SocialMedia, on_delete=models.CASCADE, related_name='posts')
     content = models.TextField()
+    links = models.ManyToManyField(Link, related_name='posts', blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     scheduled_for = models.DateTimeField(null=True, blank=True)
     published_at = models.DateTimeField(null=True, blank=True)
+    # Duplicate detection signature, see api/dedup.py
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    lsh_band_0 = models.IntegerField(null=True, editable=False)
+    lsh_band_1 = models.IntegerField(null=True, editable=False)
+    lsh_band_2 = models.IntegerField(null=True, editable=False)
+    lsh_band_3 = models.IntegerField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['social_media', 'content_hash']),
+            models.Index(fields=['social_media', 'lsh_band_0']),
+            models.Index(fields=['social_media', 'lsh_band_1']),
+            models.Index(fields=['social_media', 'lsh_band_2']),
+            models.Index(fields=['social_media', 'lsh_band_3']),
+        ]
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import User, Organization, SocialMedia, Post
+from . import links
+from .models import User, Organization, SocialMedia, Link, Post
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -16,7 +17,19 @@ class SocialMediaSerializer(serializers.ModelSerializer):
         model = SocialMedia
         fields = '__all__'
 
+class LinkSerializer(serializers.ModelSerializer):
+    short_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Link
+        fields = ('url', 'short_url', 'final_url', 'title', 'description', 'image', 'site_name', 'clicks')
+
+    def get_short_url(self, link):
+        return links.short_url(link.short_code)
+
 class PostSerializer(serializers.ModelSerializer):
+    links = LinkSerializer(many=True, read_only=True)
+
     class Meta:
         model = Post
-        fields = '__all__'
+        exclude = ('content_hash', 'lsh_band_0', 'lsh_band_1', 'lsh_band_2', 'lsh_band_3')
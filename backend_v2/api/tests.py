@@ -0,0 +1,357 @@
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+
+import jobs
+from jobs.tests import TempJobsDatabaseMixin
+from jobs.worker import run_job
+from . import dedup, links
+from .models import Link, Organization, Post, SocialMedia, SocialMediaType, User
+
+PAGE = b'''<html><head>
+<title>Fallback title</title>
+<meta property="og:title" content="Spring sale">
+<meta property="og:description" content="Thirty percent off">
+<meta property="og:image" content="/img.png">
+</head></html>'''
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.hits.append(self.path)
+        if self.path == '/slow':
+            self.server.fetching.set()
+            self.server.release.wait(5)
+        if self.path == '/missing':
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServerMixin:
+    """Serves link previews from a local http.server instead of the internet."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.server.hits = []
+        self.server.fetching = threading.Event()
+        self.server.release = threading.Event()
+
+    def link(self, path):
+        [link] = links.links_for(f'Read this: {self.base}{path}')
+        return link
+
+
+@override_settings(LINK_FETCH_ALLOW_PRIVATE=True)
+class ResolveTests(StubServerMixin, TestCase):
+    def test_preview_is_cached(self):
+        link = self.link('/page')
+        self.assertTrue(links.resolve(link))
+        link.refresh_from_db()
+        self.assertEqual(link.title, 'Spring sale')
+        self.assertEqual(link.description, 'Thirty percent off')
+        self.assertEqual(link.image, f'{self.base}/img.png')
+        self.assertEqual(link.error, '')
+        self.assertFalse(links.needs_refresh(link))
+
+        self.assertFalse(links.resolve(link))
+        self.assertEqual(self.server.hits, ['/page'])
+
+    def test_failure_is_cached(self):
+        link = self.link('/missing')
+        self.assertTrue(links.resolve(link))
+        link.refresh_from_db()
+        self.assertEqual(link.error, 'HTTP 404')
+        self.assertEqual(link.expires_at - link.fetched_at, timedelta(seconds=3600))
+
+        self.assertFalse(links.resolve(link))
+        self.assertEqual(self.server.hits, ['/missing'])
+
+    def test_expired_preview_is_refetched(self):
+        link = self.link('/page')
+        links.resolve(link)
+        Link.objects.filter(pk=link.pk).update(expires_at=link.created_at)
+        self.assertTrue(links.resolve(link))
+        self.assertEqual(self.server.hits, ['/page', '/page'])
+
+    @override_settings(LINK_FETCH_ALLOW_PRIVATE=False)
+    def test_private_hosts_are_refused(self):
+        link = self.link('/page')
+        self.assertTrue(links.resolve(link))
+        link.refresh_from_db()
+        self.assertEqual(link.error, '127.0.0.1 resolves to a non-public address')
+        self.assertEqual(link.title, '')
+        self.assertEqual(self.server.hits, [])
+
+
+@override_settings(LINK_FETCH_ALLOW_PRIVATE=True)
+class ConcurrentResolveTests(StubServerMixin, TransactionTestCase):
+    def resolve_in_thread(self, link, results):
+        try:
+            results.append(links.resolve(link))
+        finally:
+            connection.close()
+
+    def test_single_fetch(self):
+        link = self.link('/slow')
+        results = []
+        first = threading.Thread(target=self.resolve_in_thread, args=(link, results))
+        first.start()
+        self.assertTrue(self.server.fetching.wait(5))
+
+        others = [threading.Thread(target=self.resolve_in_thread, args=(link, results)) for _ in range(4)]
+        for thread in others:
+            thread.start()
+        for thread in others:
+            thread.join()
+        self.assertEqual(results, [False] * 4)
+
+        self.server.release.set()
+        first.join()
+        self.assertEqual(results, [False] * 4 + [True])
+        self.assertEqual(self.server.hits, ['/slow'])
+        link.refresh_from_db()
+        self.assertEqual(link.title, 'Spring sale')
+
+
+class ExtractUrlsTests(TestCase):
+    def test_trailing_punctuation_is_dropped(self):
+        self.assertEqual(
+            links.extract_urls('Sale at https://example.com/a. (See https://example.com/b), "https://example.com/c"!'),
+            ['https://example.com/a', 'https://example.com/b', 'https://example.com/c'],
+        )
+
+    def test_balanced_brackets_are_kept(self):
+        self.assertEqual(
+            links.extract_urls('See https://en.wikipedia.org/wiki/Foo_(bar). (Or https://en.wikipedia.org/wiki/Foo_(bar))'),
+            ['https://en.wikipedia.org/wiki/Foo_(bar)'] * 2,
+        )
+
+
+class ShortLinkTests(TestCase):
+    def test_fragment_is_kept(self):
+        link, = links.links_for('https://Example.com/a#pricing')
+        self.assertEqual(link.url, 'https://example.com/a#pricing')
+        response = self.client.get(f'/l/{link.short_code}')
+        self.assertRedirects(response, 'https://example.com/a#pricing', fetch_redirect_response=False)
+
+    @override_settings(SHORT_LINK_BASE_URL='https://pf.ly/l/')
+    def test_shorten(self):
+        link, = links.links_for('https://example.com/a')
+        self.assertEqual(links.shorten('Go to https://example.com/a!'), f'Go to https://pf.ly/l/{link.short_code}!')
+
+    @override_settings(SHORT_LINK_BASE_URL='')
+    def test_shorten_without_base_url(self):
+        links.links_for('https://example.com/a')
+        self.assertEqual(links.shorten('Go to https://example.com/a!'), 'Go to https://example.com/a!')
+
+
+class ExportImportTests(TempJobsDatabaseMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='owner')
+        cls.organization = Organization.objects.create(name='Acme', creator=user)
+        cls.account = SocialMedia.objects.create(
+            organization=cls.organization, type=SocialMediaType.TWITTER, account_name='acme', access_token='token',
+        )
+        other = Organization.objects.create(name='Other', creator=user)
+        cls.other_account = SocialMedia.objects.create(
+            organization=other, type=SocialMediaType.LINKEDIN, account_name='other', access_token='token',
+        )
+
+    def export(self, resource, file_format):
+        response = self.client.get(f'/api/organizations/{self.organization.pk}/export/{resource}/?file_format={file_format}')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def upload(self, resource, content, file_format='ndjson'):
+        return self.client.post(
+            f'/api/organizations/{self.organization.pk}/import/{resource}/?file_format={file_format}',
+            {'file': SimpleUploadedFile(f'{resource}.{file_format}', content)},
+        )
+
+    def rows(self):
+        return list(Post.objects.order_by('pk').values_list(
+            'pk', 'social_media_id', 'content', 'created_at', 'scheduled_for', 'published_at',
+        ))
+
+    def create_posts(self):
+        Post.objects.create(social_media=self.account, content='Plain post')
+        Post.objects.create(
+            social_media=self.account, content='Comma, "quotes"\nand a newline',
+            scheduled_for=datetime(2020, 3, 4, 5, 6, 7, 508906, tzinfo=timezone.utc),
+            published_at=datetime(2020, 3, 4, 5, 6, 8, tzinfo=timezone.utc),
+        )
+        Post.objects.filter(pk__isnull=False).update(created_at=datetime(2020, 1, 1, 12, 0, 0, 123456, tzinfo=timezone.utc))
+
+    def test_round_trip(self):
+        for file_format in ('ndjson', 'csv'):
+            with self.subTest(file_format):
+                self.create_posts()
+                before = self.rows()
+                exported = self.export('posts', file_format)
+                Post.objects.all().delete()
+                response = self.upload('posts', exported, file_format)
+                self.assertEqual(response.status_code, 201, response.content)
+                self.assertEqual(response.json(), {'imported': 2})
+                self.assertEqual(self.rows(), before)
+                self.assertFalse(Post.objects.filter(content_hash='').exists())
+                Post.objects.all().delete()
+
+    def test_ndjson_keeps_microseconds(self):
+        self.create_posts()
+        records = [json.loads(line) for line in self.export('posts', 'ndjson').splitlines()]
+        self.assertEqual(records[1]['scheduled_for'], '2020-03-04T05:06:07.508906+00:00')
+        self.assertEqual(records[0]['created_at'], '2020-01-01T12:00:00.123456+00:00')
+
+    def test_id_conflict(self):
+        self.create_posts()
+        response = self.upload('posts', self.export('posts', 'ndjson'))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_account_of_another_organization_is_rejected(self):
+        record = {'social_media_id': self.other_account.pk, 'content': 'Not yours'}
+        response = self.upload('posts', json.dumps(record).encode())
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Post.objects.exists())
+
+    def test_backend_export_is_translated(self):
+        # Field names and values as written by the FastAPI backend.
+        account = {
+            'id': 100, 'platform': 'twitter', 'account_name': 'moved', 'access_token': 'token',
+            'user_id': 1, 'organization_id': 1, 'created_at': '2021-05-06T07:08:09.100000+00:00',
+        }
+        post = {
+            'id': 200, 'content': 'Moved post', 'social_media_id': 100, 'author_id': 1, 'status': 'scheduled',
+            'scheduled_time': '2030-01-01T00:00:00+00:00', 'published_time': None,
+            'created_at': '2021-05-06T07:08:09+00:00',
+        }
+        self.assertEqual(self.upload('social-media', json.dumps(account).encode()).status_code, 201)
+        self.assertEqual(self.upload('posts', json.dumps(post).encode()).status_code, 201)
+        account = SocialMedia.objects.get(pk=100)
+        self.assertEqual((account.type, account.organization), (SocialMediaType.TWITTER, self.organization))
+        self.assertEqual(account.created_at, datetime(2021, 5, 6, 7, 8, 9, 100000, tzinfo=timezone.utc))
+        post = Post.objects.get(pk=200)
+        self.assertEqual(post.scheduled_for, datetime(2030, 1, 1, tzinfo=timezone.utc))
+
+    def test_invalid_records_are_rejected(self):
+        valid = {'type': 'TW', 'account_name': 'new', 'access_token': 'token'}
+        for record, message in (
+            ({**valid, 'type': 'XX'}, 'type'),
+            ({**valid, 'type': ''}, 'type'),
+            ({'account_name': 'new', 'access_token': 'token'}, "Missing required field 'type'"),
+            ({**valid, 'followers': 10}, 'Unknown field(s): followers'),
+        ):
+            with self.subTest(record):
+                response = self.upload('social-media', json.dumps(record).encode())
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(message, response.json()['file'])
+        self.assertEqual(SocialMedia.objects.count(), 2)
+
+    def test_imported_posts_are_linked_and_scheduled(self):
+        records = [
+            {'social_media_id': self.account.pk, 'content': 'Sale at https://example.com/sale',
+             'scheduled_for': '2030-01-01T00:00:00+00:00'},
+            {'social_media_id': self.account.pk, 'content': 'Nothing to do'},
+        ]
+        content = '\n'.join(json.dumps(record) for record in records).encode()
+        self.assertEqual(self.upload('posts', content).status_code, 201)
+        queue = jobs.get_queue()
+        job = queue.claim()
+        self.assertEqual(job.name, 'prepare_imported_posts')
+        scheduled = Post.objects.get(content__startswith='Sale')
+        self.assertEqual(job.payload, {'post_ids': [scheduled.pk]})
+        self.assertIsNone(queue.claim())
+
+        run_job(queue, job)
+        self.assertEqual([link.url for link in scheduled.links.all()], ['https://example.com/sale'])
+        names = [name for name, in queue.conn.execute("SELECT name FROM jobs WHERE status = 'queued'")]
+        self.assertEqual(sorted(names), ['publish_post', 'resolve_post_links'])
+
+
+class DuplicatePostTests(TempJobsDatabaseMixin, TestCase):
+    SALE = 'Our spring sale starts Monday with thirty percent off every jacket and boot in the store'
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='owner')
+        organization = Organization.objects.create(name='Acme', creator=user)
+        cls.account, cls.other_account = [
+            SocialMedia.objects.create(organization=organization, type=SocialMediaType.TWITTER, account_name=name, access_token='token')
+            for name in ('acme', 'acme-deals')
+        ]
+
+    def create(self, content, account=None, allow_duplicate=False):
+        url = '/api/posts/?allow_duplicate=1' if allow_duplicate else '/api/posts/'
+        return self.client.post(url, {'social_media': (account or self.account).pk, 'content': content}, content_type='application/json')
+
+    def test_exact_duplicate_after_normalization(self):
+        original = self.create(self.SALE).json()['id']
+        response = self.create('  OUR spring-sale starts Monday, with thirty percent off every jacket and boot in the store!! ')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['duplicate_of'], original)
+        self.assertEqual(response.json()['similarity'], 1.0)
+
+    def test_near_duplicate(self):
+        original = self.create(self.SALE).json()['id']
+        edited = self.SALE.replace('Monday', 'Tuesday')
+        self.assertGreaterEqual(dedup.similarity(self.SALE, edited), dedup.NEAR_DUPLICATE_THRESHOLD)
+        response = self.create(edited)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['duplicate_of'], original)
+        self.assertLess(response.json()['similarity'], 1.0)
+
+    def test_unrelated_post(self):
+        self.create(self.SALE)
+        self.assertEqual(self.create('Join our webinar on cloud security best practices next Thursday at noon').status_code, 201)
+
+    def test_other_account_is_not_a_duplicate(self):
+        self.create(self.SALE)
+        self.assertEqual(self.create(self.SALE, account=self.other_account).status_code, 201)
+
+    def test_allow_duplicate(self):
+        self.create(self.SALE)
+        self.assertEqual(self.create(self.SALE, allow_duplicate=True).status_code, 201)
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_empty_content_is_never_a_duplicate(self):
+        self.assertEqual(self.create('!!!').status_code, 201)
+        self.assertEqual(self.create('???').status_code, 201)
+        self.assertIsNone(dedup.find_duplicate(self.account, '', dedup.signature('')))
+
+    def test_update_recomputes_signature(self):
+        post_id = self.create(self.SALE).json()['id']
+        webinar = 'Join our webinar on cloud security best practices next Thursday at noon'
+        response = self.client.patch(f'/api/posts/{post_id}/', {'content': webinar}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        post = Post.objects.get(pk=post_id)
+        self.assertEqual({field: getattr(post, field) for field in dedup.SIGNATURE_FIELDS}, dedup.signature(webinar))
+        self.assertEqual(self.create(self.SALE).status_code, 201)
+        self.assertEqual(self.create(webinar).status_code, 409)
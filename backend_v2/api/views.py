@@ -1,7 +1,23 @@
-from rest_framework import viewsets
-from .models import User, Organization, SocialMedia, Post
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+import jobs
+from jobs.tasks import schedule_publish, update_post_links
+from . import bulk, dedup, links
+from .models import User, Organization, SocialMedia, Link, Post
 from .serializers import UserSerializer, OrganizationSerializer, SocialMediaSerializer, PostSerializer
 
+EXPORT_FIELDS = {
+    'posts': (Post, ['id', 'social_media_id', 'content', 'created_at', 'scheduled_for', 'published_at']),
+    'social-media': (SocialMedia, ['id', 'organization_id', 'type', 'account_name', 'access_token', 'created_at']),
+}
+
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -10,10 +26,126 @@ class OrganizationViewSet(viewsets.ModelViewSet):
     queryset = Organization.objects.all()
     serializer_class = OrganizationSerializer
 
+    def get_file_format(self, request):
+        # ``format`` is taken by DRF's content negotiation.
+        file_format = request.query_params.get('file_format', 'ndjson')
+        if file_format not in bulk.CONTENT_TYPES:
+            raise ValidationError({'file_format': f'Expected one of {", ".join(bulk.CONTENT_TYPES)}.'})
+        return file_format
+
+    @action(detail=True, methods=['get'], url_path='export/(?P<resource>posts|social-media)')
+    def export(self, request, pk=None, resource=None):
+        organization = self.get_object()
+        file_format = self.get_file_format(request)
+        model, fields = EXPORT_FIELDS[resource]
+        if model is Post:
+            queryset = Post.objects.filter(social_media__organization=organization)
+        else:
+            queryset = organization.social_media_accounts.all()
+        # Pick the read database now: the body streams after ReplicaRoutingMiddleware has returned.
+        queryset = queryset.using(queryset.db)
+        # iterator() streams through a server-side cursor instead of caching the whole org.
+        rows = queryset.order_by('pk').values_list(*fields).iterator(chunk_size=bulk.BATCH_SIZE)
+        response = StreamingHttpResponse(
+            bulk.export_rows(rows, fields, file_format),
+            content_type=bulk.CONTENT_TYPES[file_format],
+        )
+        response['Content-Disposition'] = f'attachment; filename="organization-{organization.pk}-{resource}.{file_format}"'
+        return response
+
+    @action(detail=True, methods=['post'], url_path='import/(?P<resource>posts|social-media)', url_name='import')
+    def import_data(self, request, pk=None, resource=None):
+        organization = self.get_object()
+        file_format = self.get_file_format(request)
+        uploaded = request.FILES.get('file')
+        if uploaded is None:
+            raise ValidationError({'file': 'No file was submitted.'})
+        model, fields = EXPORT_FIELDS[resource]
+        if model is Post:
+            fields = fields + dedup.SIGNATURE_FIELDS
+        account_ids = set(organization.social_media_accounts.values_list('pk', flat=True))
+
+        def prepare(records):
+            for record in records:
+                record = bulk.translate(record)
+                if model is Post:
+                    if int(record.get('social_media_id') or 0) not in account_ids:
+                        raise ValueError(f"Social media account {record.get('social_media_id')} is not part of this organization")
+                    record.update(dedup.signature(record.get('content') or ''))
+                else:
+                    record['organization_id'] = organization.pk
+                yield record
+
+        # Imported posts that link somewhere or still have to be published get the follow-up
+        # perform_create would have done, in one job per batch once the import has committed.
+        follow_up = []
+
+        def collect(posts):
+            post_ids = [
+                post.pk for post in posts
+                if (post.scheduled_for is not None and post.published_at is None) or links.URL_RE.search(post.content)
+            ]
+            if post_ids:
+                follow_up.append(('prepare_imported_posts', {'post_ids': post_ids}))
+
+        try:
+            with transaction.atomic():
+                count = bulk.import_rows(
+                    model, fields, prepare(bulk.read_rows(uploaded, file_format)),
+                    on_batch=collect if model is Post else None,
+                )
+        except (ValueError, TypeError, DjangoValidationError) as exc:
+            raise ValidationError({'file': str(exc)})
+        except IntegrityError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_409_CONFLICT)
+        if follow_up:
+            jobs.get_queue().enqueue_many(follow_up)
+        return Response({'imported': count}, status=status.HTTP_201_CREATED)
+
 class SocialMediaViewSet(viewsets.ModelViewSet):
     queryset = SocialMedia.objects.all()
     serializer_class = SocialMediaSerializer
 
 class PostViewSet(viewsets.ModelViewSet):
-    queryset = Post.objects.all()
+    queryset = Post.objects.prefetch_related('links')
     serializer_class = PostSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        signature = dedup.signature(data['content'])
+        if request.query_params.get('allow_duplicate') not in ('1', 'true', 'True'):
+            # Best effort: concurrent creates of the same post can both get past this check.
+            duplicate = dedup.find_duplicate(data['social_media'], data['content'], signature)
+            if duplicate is not None:
+                return Response({
+                    'detail': 'A similar post already exists for this social media account.',
+                    'duplicate_of': duplicate[0].pk,
+                    'similarity': round(duplicate[1], 3),
+                }, status=status.HTTP_409_CONFLICT)
+        self.perform_create(serializer, signature)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    def perform_create(self, serializer, signature=None):
+        if signature is None:
+            signature = dedup.signature(serializer.validated_data['content'])
+        post = serializer.save(**signature)
+        update_post_links(post)
+        schedule_publish(post)
+
+    def perform_update(self, serializer):
+        previous_schedule = serializer.instance.scheduled_for
+        content = serializer.validated_data.get('content')
+        signature = dedup.signature(content) if content is not None and content != serializer.instance.content else {}
+        post = serializer.save(**signature)
+        if signature:
+            update_post_links(post)
+        if post.scheduled_for != previous_schedule:
+            schedule_publish(post)
+
+def follow_short_link(request, code):
+    link = get_object_or_404(Link, short_code=code)
+    Link.objects.filter(pk=link.pk).update(clicks=F('clicks') + 1)
+    return redirect(link.url)
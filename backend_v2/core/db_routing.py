@@ -0,0 +1,90 @@
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PRIMARY_COOKIE = 'db_primary'
+REPLICA_LAG_SQL = (
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END'
+)
+
+_state = ContextVar('db_routing_state', default=None)
+_lag = {}
+
+
+class RoutingState:
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.replica = None
+        self.wrote = False
+
+
+def replica_lag(alias):
+    """Seconds ``alias`` is behind the primary, re-measured at most once per REPLICA_CHECK_INTERVAL."""
+    checked_at, lag = _lag.get(alias, (0.0, 0.0))
+    now = time.monotonic()
+    if now - checked_at > settings.REPLICA_CHECK_INTERVAL:
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(REPLICA_LAG_SQL if connection.vendor == 'postgresql' else 'SELECT 0')
+                lag = float(cursor.fetchone()[0] or 0)
+        except DatabaseError:
+            lag = float('inf')
+        _lag[alias] = (now, lag)
+    return lag
+
+
+class PrimaryReplicaRouter:
+    """Routes reads of safe requests to a replica in DATABASE_REPLICAS.
+
+    Writes always go to ``default`` and pin the rest of the request there; outside a
+    request (shell, workers, migrations) everything uses ``default``.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.use_replica or state.wrote:
+            return 'default'
+        if state.replica is None:
+            healthy = [alias for alias in settings.DATABASE_REPLICAS if replica_lag(alias) <= settings.REPLICA_MAX_LAG]
+            state.replica = random.choice(healthy) if healthy else 'default'
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaRoutingMiddleware:
+    """Decides per request whether reads may use a replica.
+
+    A request that writes sets a short-lived cookie so the same client keeps reading
+    from the primary until the replicas have caught up with its write.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RoutingState(request.method in SAFE_METHODS and PRIMARY_COOKIE not in request.COOKIES)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            response.set_cookie(PRIMARY_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS, httponly=True)
+        return response
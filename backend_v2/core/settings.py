@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -21,6 +22,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.db_routing.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -70,6 +72,38 @@ DATABASES = {
     }
 }
 
+DATABASE_ROUTERS = ['core.db_routing.PrimaryReplicaRouter']
+
+# Aliases in DATABASES that replicate 'default'. Reads of safe requests go to one of them
+# unless it lags more than REPLICA_MAX_LAG seconds behind; a client that wrote reads
+# from the primary for REPLICA_STICKY_SECONDS afterwards.
+DATABASE_REPLICAS = []
+
+REPLICA_MAX_LAG = 2.0
+
+REPLICA_STICKY_SECONDS = 5
+
+REPLICA_CHECK_INTERVAL = 1.0
+
+JOBS_DATABASE = BASE_DIR / 'jobs.sqlite3'
+
+JOBS_CONCURRENCY = 4
+
+# Public prefix of short links, e.g. https://pfly.example/l/ (served by the `short-link` route).
+# Unset means URLs are published as written.
+SHORT_LINK_BASE_URL = os.environ.get('SHORT_LINK_BASE_URL', '')
+
+# Link previews are refetched after LINK_PREVIEW_TTL seconds; failed fetches are cached
+# for LINK_ERROR_TTL so a dead URL isn't retried for every post that mentions it.
+LINK_PREVIEW_TTL = 7 * 24 * 3600
+
+LINK_ERROR_TTL = 3600
+
+LINK_FETCH_TIMEOUT = 10
+
+# Allow previews of private/loopback hosts; only tests turn this on (override_settings).
+LINK_FETCH_ALLOW_PRIVATE = False
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -0,0 +1,9 @@
+from .settings import *  # noqa: F401,F403
+
+# A second SQLite database standing in for a read replica, used by core/tests.py
+# (which route to it with override_settings):
+#   python manage.py test api.tests core.tests --settings=core.test_settings
+DATABASES['replica'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': BASE_DIR / 'replica.sqlite3',
+}
@@ -0,0 +1,71 @@
+import time
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.db import OperationalError, connections
+from django.test import TestCase, override_settings
+
+from api.models import User
+from . import db_routing
+from .db_routing import PRIMARY_COOKIE, RoutingState
+
+
+HAS_REPLICA = 'replica' in settings.DATABASES
+
+
+@skipUnless(HAS_REPLICA, 'needs a replica alias, run with --settings=core.test_settings')
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TestCase):
+    databases = {'default', 'replica'} if HAS_REPLICA else {'default'}
+
+    @classmethod
+    def setUpClass(cls):
+        # Migrations only run on the primary; give the stand-in replica the one table read here.
+        replica = connections['replica']
+        if User._meta.db_table not in replica.introspection.table_names():
+            with replica.schema_editor() as editor:
+                editor.create_model(User)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create(username='primary')
+        User.objects.using('replica').create(username='replica')
+
+    def setUp(self):
+        db_routing._lag.clear()
+
+    def usernames(self, response):
+        self.assertEqual(response.status_code, 200)
+        return sorted(user['username'] for user in response.json())
+
+    def test_get_reads_from_replica(self):
+        self.assertEqual(self.usernames(self.client.get('/api/users/')), ['replica'])
+
+    def test_write_pins_request_to_primary(self):
+        token = db_routing._state.set(RoutingState(use_replica=True))
+        try:
+            self.assertEqual(sorted(User.objects.values_list('username', flat=True)), ['replica'])
+            User.objects.create(username='new')
+            self.assertEqual(sorted(User.objects.values_list('username', flat=True)), ['new', 'primary'])
+        finally:
+            db_routing._state.reset(token)
+
+    def test_write_sets_sticky_cookie(self):
+        response = self.client.post('/api/users/', {'username': 'new'})
+        self.assertEqual(response.status_code, 201)
+        cookie = response.cookies[PRIMARY_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_STICKY_SECONDS)
+
+        self.assertEqual(self.usernames(self.client.get('/api/users/')), ['new', 'primary'])
+        del self.client.cookies[PRIMARY_COOKIE]
+        self.assertEqual(self.usernames(self.client.get('/api/users/')), ['replica'])
+
+    def test_lagging_replica_is_skipped(self):
+        db_routing._lag['replica'] = (time.monotonic(), float('inf'))
+        self.assertEqual(self.usernames(self.client.get('/api/users/')), ['primary'])
+
+    def test_unreachable_replica_is_skipped(self):
+        with mock.patch.object(connections['replica'], 'cursor', side_effect=OperationalError('unable to open database')):
+            self.assertEqual(self.usernames(self.client.get('/api/users/')), ['primary'])
+        self.assertEqual(db_routing._lag['replica'][1], float('inf'))
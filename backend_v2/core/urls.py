@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from api.views import UserViewSet, OrganizationViewSet, SocialMediaViewSet, PostViewSet
+from api.views import UserViewSet, OrganizationViewSet, SocialMediaViewSet, PostViewSet, follow_short_link
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet)
@@ -12,4 +12,5 @@ router.register(r'posts', PostViewSet)
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include(router.urls)),
+    path('l/<str:code>', follow_short_link, name='short-link'),
 ]
@@ -0,0 +1,19 @@
+import threading
+
+from .queue import JobQueue, Job
+from .registry import task, PermanentError
+
+_local = threading.local()
+
+
+def get_queue():
+    """Per-thread queue on ``settings.JOBS_DATABASE``; SQLite connections can't be shared across threads."""
+    queue = getattr(_local, 'queue', None)
+    if queue is None:
+        from django.conf import settings
+        queue = _local.queue = JobQueue(settings.JOBS_DATABASE)
+    return queue
+
+
+def enqueue(name, payload=None, **kwargs):
+    return get_queue().enqueue(name, payload, **kwargs)
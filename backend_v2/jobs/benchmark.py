@@ -0,0 +1,39 @@
+import os
+import tempfile
+import time
+
+from .queue import JobQueue
+from .registry import task
+from .worker import Worker
+
+
+@task
+def noop():
+    pass
+
+
+def register():
+    from . import benchmark  # noqa: F401  (registers ``noop`` in spawned workers)
+
+
+def run(jobs=10000, concurrency=4):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.sqlite3')
+        queue = JobQueue(path)
+
+        started = time.perf_counter()
+        queue.enqueue_many(('noop', None) for _ in range(jobs))
+        enqueued = time.perf_counter() - started
+
+        started = time.perf_counter()
+        Worker(path, concurrency=concurrency, poll_interval=0.01, setup=register, burst=True).run()
+        processed = time.perf_counter() - started
+
+        stats = queue.stats()
+        queue.close()
+
+    print(f'enqueue: {jobs} jobs in {enqueued:.2f}s ({jobs / enqueued:.0f} jobs/s)')
+    print(f'process: {jobs} jobs in {processed:.2f}s ({jobs / processed:.0f} jobs/s) '
+          f'with {concurrency} worker(s)')
+    print(f'final: {stats}')
+    return stats
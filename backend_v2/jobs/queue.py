@@ -0,0 +1,165 @@
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+DEAD = 'dead'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_at REAL NOT NULL,
+    locked_until REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority DESC, run_at, id);
+'''
+
+
+@dataclass
+class Job:
+    id: int
+    name: str
+    payload: dict
+    priority: int
+    attempts: int
+    max_attempts: int
+
+
+class JobQueue:
+    """Persistent job queue backed by a single SQLite file.
+
+    Every process opens its own connection; claims run inside ``BEGIN IMMEDIATE``
+    so two workers never pick up the same job.
+    """
+
+    def __init__(self, path, lease=300.0, backoff=5.0):
+        self.path = str(path)
+        self.lease = lease
+        self.backoff = backoff
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def enqueue(self, name, payload=None, priority=0, delay=0.0, max_attempts=3):
+        now = time.time()
+        cur = self.conn.execute(
+            'INSERT INTO jobs (name, payload, priority, max_attempts, run_at, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (name, json.dumps(payload or {}), priority, max_attempts, now + delay, now),
+        )
+        return cur.lastrowid
+
+    def enqueue_many(self, jobs):
+        """Insert ``(name, payload)`` pairs in one transaction."""
+        now = time.time()
+        self.conn.execute('BEGIN')
+        try:
+            self.conn.executemany(
+                'INSERT INTO jobs (name, payload, run_at, created_at) VALUES (?, ?, ?, ?)',
+                ((name, json.dumps(payload or {}), now, now) for name, payload in jobs),
+            )
+            self.conn.execute('COMMIT')
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+
+    def claim(self):
+        """Lock the next runnable job and return it, or ``None`` if nothing is due.
+
+        Jobs left ``running`` past their lease (crashed worker) are claimable again, unless
+        they have used up their attempts: a job that keeps killing its worker is dead-lettered.
+        """
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            self.conn.execute(
+                'UPDATE jobs SET status = ?, locked_until = NULL, last_error = ?, finished_at = ? '
+                'WHERE status = ? AND locked_until < ? AND attempts >= max_attempts',
+                (DEAD, 'Lease expired: the worker running this job died', now, RUNNING, now),
+            )
+            row = self.conn.execute(
+                'SELECT id, name, payload, priority, attempts, max_attempts FROM jobs '
+                'WHERE (status = ? AND run_at <= ?) OR (status = ? AND locked_until < ?) '
+                'ORDER BY priority DESC, run_at, id LIMIT 1',
+                (QUEUED, now, RUNNING, now),
+            ).fetchone()
+            if row is None:
+                self.conn.execute('COMMIT')
+                return None
+            self.conn.execute(
+                'UPDATE jobs SET status = ?, attempts = attempts + 1, locked_until = ? WHERE id = ?',
+                (RUNNING, now + self.lease, row[0]),
+            )
+            self.conn.execute('COMMIT')
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        return Job(row[0], row[1], json.loads(row[2]), row[3], row[4] + 1, row[5])
+
+    def extend(self, job):
+        """Renew the lease of a job that is still running."""
+        self.conn.execute(
+            'UPDATE jobs SET locked_until = ? WHERE id = ? AND status = ?',
+            (time.time() + self.lease, job.id, RUNNING),
+        )
+
+    def complete(self, job):
+        self.conn.execute(
+            'UPDATE jobs SET status = ?, locked_until = NULL, finished_at = ? WHERE id = ?',
+            (DONE, time.time(), job.id),
+        )
+
+    def fail(self, job, error, retry=True):
+        """Reschedule with exponential backoff, or dead-letter once attempts run out."""
+        now = time.time()
+        if retry and job.attempts < job.max_attempts:
+            self.conn.execute(
+                'UPDATE jobs SET status = ?, locked_until = NULL, last_error = ?, run_at = ? WHERE id = ?',
+                (QUEUED, error, now + self.backoff * 2 ** (job.attempts - 1), job.id),
+            )
+        else:
+            self.conn.execute(
+                'UPDATE jobs SET status = ?, locked_until = NULL, last_error = ?, finished_at = ? WHERE id = ?',
+                (DEAD, error, now, job.id),
+            )
+
+    def retry_dead(self, job_id=None):
+        query = 'UPDATE jobs SET status = ?, attempts = 0, run_at = ?, finished_at = NULL WHERE status = ?'
+        params = [QUEUED, time.time(), DEAD]
+        if job_id is not None:
+            query += ' AND id = ?'
+            params.append(job_id)
+        return self.conn.execute(query, params).rowcount
+
+    def dead(self, limit=50):
+        return self.conn.execute(
+            'SELECT id, name, payload, attempts, last_error FROM jobs WHERE status = ? '
+            'ORDER BY finished_at DESC LIMIT ?',
+            (DEAD, limit),
+        ).fetchall()
+
+    def purge(self, older_than):
+        """Delete finished jobs older than ``older_than`` seconds; dead letters are kept."""
+        return self.conn.execute(
+            'DELETE FROM jobs WHERE status = ? AND finished_at < ?',
+            (DONE, time.time() - older_than),
+        ).rowcount
+
+    def stats(self):
+        return dict(self.conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
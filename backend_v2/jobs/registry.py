@@ -0,0 +1,12 @@
+TASKS = {}
+
+
+class PermanentError(Exception):
+    """Raised by a task when retrying cannot help; the job is dead-lettered at once."""
+
+
+def task(func=None, *, name=None):
+    def register(f):
+        TASKS[name or f.__name__] = f
+        return f
+    return register(func) if func is not None else register
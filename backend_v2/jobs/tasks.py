@@ -0,0 +1,121 @@
+import json
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.utils import timezone
+
+from api import dedup, links
+from api.models import Link, Post, SocialMediaType
+from . import enqueue
+from .queue import JobQueue
+from .registry import task, PermanentError
+
+
+def publish_to_x(post, text):
+    request = urllib.request.Request(
+        'https://api.x.com/2/tweets',
+        data=json.dumps({'text': text}).encode(),
+        headers={
+            'Authorization': f'Bearer {post.social_media.access_token}',
+            'Content-Type': 'application/json',
+        },
+        method='POST',
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as exc:
+        # Rate limits and server errors are worth retrying, anything else is not.
+        if exc.code == 429 or exc.code >= 500:
+            raise
+        raise PermanentError(f'X API returned {exc.code}: {exc.read().decode(errors="replace")}') from exc
+
+
+PUBLISHERS = {
+    SocialMediaType.TWITTER: publish_to_x,
+}
+
+
+def schedule_publish(post):
+    """Enqueue ``publish_post`` for the post's current ``scheduled_for``.
+
+    The job carries the schedule it was created for, so jobs left over from an earlier
+    schedule find it changed and do nothing.
+    """
+    if post.scheduled_for is None or post.published_at is not None:
+        return
+    delay = max((post.scheduled_for - timezone.now()).total_seconds(), 0)
+    enqueue('publish_post', {'post_id': post.pk, 'scheduled_for': post.scheduled_for.isoformat()}, delay=delay)
+
+
+def update_post_links(post):
+    """Point ``post.links`` at the URLs in its content and fetch missing previews in a job."""
+    post_links = links.links_for(post.content)
+    post.links.set(post_links)
+    if any(links.needs_refresh(link) for link in post_links):
+        enqueue('resolve_post_links', {'post_id': post.pk})
+
+
+@task
+def publish_post(post_id, scheduled_for=None):
+    try:
+        post = Post.objects.select_related('social_media').get(pk=post_id)
+    except Post.DoesNotExist:
+        raise PermanentError(f'Post {post_id} no longer exists')
+    if post.published_at is not None or post.scheduled_for is None:
+        return
+    if scheduled_for is not None and post.scheduled_for.isoformat() != scheduled_for:
+        return
+    if post.scheduled_for > timezone.now():
+        schedule_publish(post)
+        return
+    publisher = PUBLISHERS.get(post.social_media.type)
+    if publisher is None:
+        raise PermanentError(f'Publishing to {post.social_media.get_type_display()} is not supported')
+    # Links were resolved when the post was created, so this is a cache lookup, not a fetch.
+    publisher(post, links.shorten(post.content))
+    post.published_at = timezone.now()
+    post.save(update_fields=['published_at'])
+
+
+@task
+def resolve_post_links(post_id):
+    for link in Link.objects.filter(posts=post_id):
+        links.resolve(link)
+
+
+@task
+def prepare_imported_posts(post_ids):
+    # Imports skip perform_create: link the posts and schedule them here instead.
+    for post in Post.objects.filter(pk__in=post_ids):
+        update_post_links(post)
+        schedule_publish(post)
+
+
+@task
+def backfill_post_signatures(batch_size=2000, recompute=False):
+    # Posts created before duplicate detection have no signature and are never matched;
+    # ``recompute`` rewrites every signature after the shingling scheme changes.
+    last_pk = 0
+    while True:
+        posts = Post.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'content')
+        if not recompute:
+            posts = posts.filter(content_hash='')
+        posts = list(posts[:batch_size])
+        if not posts:
+            return
+        last_pk = posts[-1].pk
+        for post in posts:
+            for field, value in dedup.signature(post.content).items():
+                setattr(post, field, value)
+        Post.objects.bulk_update(posts, dedup.SIGNATURE_FIELDS)
+
+
+@task
+def cleanup_jobs(older_than=7 * 24 * 3600):
+    queue = JobQueue(settings.JOBS_DATABASE)
+    try:
+        queue.purge(older_than)
+    finally:
+        queue.close()
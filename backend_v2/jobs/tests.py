@@ -0,0 +1,229 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+import jobs
+from api.models import Organization, Post, SocialMedia, SocialMediaType, User
+from . import tasks
+from .queue import DEAD, DONE, QUEUED, RUNNING, JobQueue
+from .registry import PermanentError
+from .worker import Heartbeat, run_job, work
+
+
+class QueueTestCase(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'jobs.sqlite3')
+        self.queue = JobQueue(self.path, lease=60.0, backoff=5.0)
+        self.addCleanup(self.queue.close)
+        self.calls = []
+        patcher = mock.patch.dict('jobs.registry.TASKS', {
+            'record': lambda **payload: self.calls.append(payload),
+            'crash': self.crash,
+            'reject': self.reject,
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def crash(self):
+        raise RuntimeError('boom')
+
+    def reject(self):
+        raise PermanentError('no point retrying')
+
+    def row(self, job_id):
+        return self.queue.conn.execute(
+            'SELECT status, attempts, run_at, locked_until, last_error FROM jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+
+
+class JobQueueTests(QueueTestCase):
+    def test_priority_then_fifo(self):
+        first = self.queue.enqueue('record', {'n': 1})
+        second = self.queue.enqueue('record', {'n': 2})
+        urgent = self.queue.enqueue('record', {'n': 3}, priority=10)
+        self.assertEqual([self.queue.claim().id for _ in range(3)], [urgent, first, second])
+        self.assertIsNone(self.queue.claim())
+
+    def test_delayed_job_waits_for_run_at(self):
+        job_id = self.queue.enqueue('record', delay=30)
+        self.assertIsNone(self.queue.claim())
+        with mock.patch('jobs.queue.time.time', return_value=time.time() + 31):
+            self.assertEqual(self.queue.claim().id, job_id)
+
+    def test_retry_backoff_then_dead_letter(self):
+        job_id = self.queue.enqueue('crash')
+        for attempt, backoff in ((1, 5.0), (2, 10.0)):
+            job = self.queue.claim()
+            self.assertEqual(job.attempts, attempt)
+            before = time.time()
+            with self.assertLogs('jobs.worker', 'ERROR'):
+                run_job(self.queue, job)
+            status, attempts, run_at, _, error = self.row(job_id)
+            self.assertEqual((status, attempts), (QUEUED, attempt))
+            self.assertAlmostEqual(run_at - before, backoff, delta=1)
+            self.assertIn('RuntimeError: boom', error)
+            self.queue.conn.execute('UPDATE jobs SET run_at = 0 WHERE id = ?', (job_id,))
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            run_job(self.queue, self.queue.claim())
+        self.assertEqual(self.row(job_id)[:2], (DEAD, 3))
+        self.assertEqual(len(self.queue.dead()), 1)
+
+    def test_permanent_error_is_dead_lettered_at_once(self):
+        job_id = self.queue.enqueue('reject')
+        with self.assertLogs('jobs.worker', 'WARNING'):
+            run_job(self.queue, self.queue.claim())
+        status, attempts, _, _, error = self.row(job_id)
+        self.assertEqual((status, attempts), (DEAD, 1))
+        self.assertIn('no point retrying', error)
+
+    def test_unknown_task_is_dead_lettered(self):
+        job_id = self.queue.enqueue('missing')
+        run_job(self.queue, self.queue.claim())
+        self.assertEqual(self.row(job_id)[0], DEAD)
+
+    def test_expired_lease_is_reclaimed(self):
+        job_id = self.queue.enqueue('record')
+        self.queue.claim()
+        self.assertIsNone(self.queue.claim())
+        with mock.patch('jobs.queue.time.time', return_value=time.time() + 61):
+            job = self.queue.claim()
+        self.assertEqual((job.id, job.attempts), (job_id, 2))
+
+    def test_expired_lease_out_of_attempts_is_dead_lettered(self):
+        job_id = self.queue.enqueue('record', max_attempts=1)
+        self.queue.claim()
+        with mock.patch('jobs.queue.time.time', return_value=time.time() + 61):
+            self.assertIsNone(self.queue.claim())
+        status, _, _, locked_until, error = self.row(job_id)
+        self.assertEqual((status, locked_until), (DEAD, None))
+        self.assertIn('Lease expired', error)
+
+    def test_retry_dead(self):
+        job_id = self.queue.enqueue('reject')
+        with self.assertLogs('jobs.worker', 'WARNING'):
+            run_job(self.queue, self.queue.claim())
+        self.assertEqual(self.queue.retry_dead(), 1)
+        self.assertEqual(self.row(job_id)[:2], (QUEUED, 0))
+
+
+class WorkerTests(QueueTestCase):
+    def test_heartbeat_renews_lease(self):
+        queue = JobQueue(self.path, lease=0.3)
+        self.addCleanup(queue.close)
+        queue.enqueue('record')
+        job = queue.claim()
+        claimed_until = self.row(job.id)[3]
+        heartbeat = Heartbeat(self.path, 0.3)
+        heartbeat.job = job
+        heartbeat.start()
+        time.sleep(0.5)
+        heartbeat.stopped.set()
+        heartbeat.join()
+        status, _, _, locked_until, _ = self.row(job.id)
+        self.assertEqual(status, RUNNING)
+        self.assertGreater(locked_until, claimed_until)
+
+    def test_burst_runs_every_job_with_hook(self):
+        for n in range(3):
+            self.queue.enqueue('record', {'n': n})
+        hook = mock.Mock()
+        work(self.path, threading.Event(), poll_interval=0.01, burst=True, on_job=hook)
+        self.assertEqual(self.calls, [{'n': 0}, {'n': 1}, {'n': 2}])
+        self.assertEqual(self.queue.stats(), {DONE: 3})
+        self.assertEqual(hook.call_count, 6)
+
+    def test_hook_runs_after_failed_job(self):
+        self.queue.enqueue('crash', max_attempts=1)
+        hook = mock.Mock()
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            work(self.path, threading.Event(), poll_interval=0.01, burst=True, on_job=hook)
+        self.assertEqual(self.queue.stats(), {DEAD: 1})
+        self.assertEqual(hook.call_count, 2)
+
+
+class TempJobsDatabaseMixin:
+    """Points ``JOBS_DATABASE`` and ``jobs.get_queue()`` at a scratch file for each test."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings = override_settings(JOBS_DATABASE=os.path.join(directory, 'jobs.sqlite3'))
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # get_queue() keeps one queue per thread; drop it so it reopens on the scratch file.
+        self.close_queue()
+        self.addCleanup(self.close_queue)
+
+    def close_queue(self):
+        queue = jobs._local.__dict__.pop('queue', None)
+        if queue is not None:
+            queue.close()
+
+
+class PublishPostTests(TempJobsDatabaseMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='owner')
+        organization = Organization.objects.create(name='Acme', creator=user)
+        cls.account = SocialMedia.objects.create(
+            organization=organization, type=SocialMediaType.TWITTER, account_name='acme', access_token='token',
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.publisher = mock.Mock()
+        patcher = mock.patch.dict(tasks.PUBLISHERS, {SocialMediaType.TWITTER: self.publisher})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def queued(self):
+        return [job.payload for job in iter(jobs.get_queue().claim, None)]
+
+    def post(self, scheduled_for):
+        return Post.objects.create(social_media=self.account, content='Spring sale', scheduled_for=scheduled_for)
+
+    def test_due_post_is_published(self):
+        post = self.post(timezone.now() - timedelta(minutes=1))
+        tasks.publish_post(post.pk, post.scheduled_for.isoformat())
+        self.publisher.assert_called_once()
+        post.refresh_from_db()
+        self.assertIsNotNone(post.published_at)
+
+    def test_future_post_is_requeued(self):
+        post = self.post(timezone.now() + timedelta(hours=1))
+        tasks.publish_post(post.pk, post.scheduled_for.isoformat())
+        self.publisher.assert_not_called()
+        run_at = jobs.get_queue().conn.execute('SELECT run_at FROM jobs').fetchone()[0]
+        self.assertAlmostEqual(run_at - time.time(), 3600, delta=5)
+
+    def test_job_for_old_schedule_does_nothing(self):
+        old = timezone.now() - timedelta(minutes=1)
+        post = self.post(old)
+        tasks.schedule_publish(post)
+        Post.objects.filter(pk=post.pk).update(scheduled_for=timezone.now() - timedelta(seconds=1))
+        [payload] = self.queued()
+        self.assertEqual(payload['scheduled_for'], old.isoformat())
+        tasks.publish_post(**payload)
+        self.publisher.assert_not_called()
+        post.refresh_from_db()
+        self.assertIsNone(post.published_at)
+
+    def test_published_post_is_not_published_again(self):
+        post = self.post(timezone.now() - timedelta(minutes=1))
+        Post.objects.filter(pk=post.pk).update(published_at=timezone.now())
+        tasks.publish_post(post.pk, post.scheduled_for.isoformat())
+        self.publisher.assert_not_called()
+
+    def test_deleted_post_is_a_permanent_error(self):
+        with self.assertRaises(PermanentError):
+            tasks.publish_post(0)
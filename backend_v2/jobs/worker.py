@@ -0,0 +1,137 @@
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+import traceback
+
+from .queue import JobQueue
+from .registry import TASKS, PermanentError
+
+logger = logging.getLogger(__name__)
+
+
+class Heartbeat(threading.Thread):
+    """Renews the lease of the job a worker is running so long jobs aren't reclaimed."""
+
+    def __init__(self, path, lease):
+        super().__init__(daemon=True)
+        self.path = path
+        self.lease = lease
+        self.job = None
+        self.stopped = threading.Event()
+
+    def run(self):
+        # SQLite connections are per thread, so the heartbeat opens its own.
+        queue = JobQueue(self.path, lease=self.lease)
+        try:
+            while not self.stopped.wait(self.lease / 3):
+                job = self.job
+                if job is not None:
+                    queue.extend(job)
+        finally:
+            queue.close()
+
+
+def run_job(queue, job, heartbeat=None):
+    func = TASKS.get(job.name)
+    if func is None:
+        queue.fail(job, f'Unknown task {job.name!r}', retry=False)
+        return
+    if heartbeat is not None:
+        heartbeat.job = job
+    try:
+        func(**job.payload)
+    except PermanentError as exc:
+        logger.warning('Job %s (%s) failed permanently: %s', job.id, job.name, exc)
+        queue.fail(job, traceback.format_exc(), retry=False)
+    except Exception:
+        logger.exception('Job %s (%s) failed on attempt %s', job.id, job.name, job.attempts)
+        queue.fail(job, traceback.format_exc())
+    else:
+        queue.complete(job)
+    finally:
+        if heartbeat is not None:
+            heartbeat.job = None
+
+
+def work(path, stop, poll_interval=1.0, setup=None, burst=False, on_job=None):
+    """Claim and run jobs until ``stop`` is set.
+
+    A job that has started always runs to completion, so setting ``stop`` is a
+    graceful shutdown. With ``burst`` the loop also exits once the queue is empty.
+    ``on_job`` is called before and after every job, e.g. to drop stale database
+    connections.
+    """
+    if setup is not None:
+        setup()
+    queue = JobQueue(path)
+    heartbeat = Heartbeat(queue.path, queue.lease)
+    heartbeat.start()
+    try:
+        while not stop.is_set():
+            job = queue.claim()
+            if job is None:
+                if burst:
+                    break
+                stop.wait(poll_interval)
+                continue
+            if on_job is not None:
+                on_job()
+            try:
+                run_job(queue, job, heartbeat)
+            finally:
+                if on_job is not None:
+                    on_job()
+    finally:
+        heartbeat.stopped.set()
+        heartbeat.join()
+        queue.close()
+
+
+def _child(path, stop, poll_interval, setup, burst, on_job):
+    # The parent owns shutdown: children ignore Ctrl+C and wait for ``stop``.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    work(path, stop, poll_interval, setup, burst, on_job)
+
+
+class Worker:
+    """Supervises ``concurrency`` worker processes sharing one queue file."""
+
+    def __init__(self, path, concurrency=1, poll_interval=1.0, setup=None, burst=False, on_job=None):
+        self.path = str(path)
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.setup = setup
+        self.burst = burst
+        self.on_job = on_job
+        self.stop = multiprocessing.Event()
+        self.processes = []
+
+    def start(self):
+        for _ in range(self.concurrency):
+            process = multiprocessing.Process(
+                target=_child,
+                args=(self.path, self.stop, self.poll_interval, self.setup, self.burst, self.on_job),
+            )
+            process.start()
+            self.processes.append(process)
+
+    def shutdown(self, *args):
+        if not self.stop.is_set():
+            logger.info('Shutting down, waiting for running jobs to finish')
+            self.stop.set()
+
+    def join(self):
+        for process in self.processes:
+            process.join()
+
+    def run(self):
+        JobQueue(self.path).close()  # create the schema before the children race for it
+        signal.signal(signal.SIGINT, self.shutdown)
+        signal.signal(signal.SIGTERM, self.shutdown)
+        started = time.time()
+        self.start()
+        self.join()
+        logger.info('Worker stopped after %.1fs', time.time() - started)
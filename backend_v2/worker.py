@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""Command-line entry point for the background job queue."""
+import argparse
+import json
+import logging
+import os
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    import django
+    django.setup()
+    import jobs.tasks  # noqa: F401  (registers the tasks)
+
+
+def close_old_connections():
+    # Drops connections the database closed or that outlived CONN_MAX_AGE, like Django does per request.
+    from django.db import close_old_connections
+    close_old_connections()
+
+
+def get_queue():
+    from django.conf import settings
+    from jobs import JobQueue
+    return JobQueue(settings.JOBS_DATABASE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run and manage background jobs.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='start worker processes')
+    run.add_argument('-c', '--concurrency', type=int, default=None)
+    run.add_argument('--poll-interval', type=float, default=1.0)
+    run.add_argument('--burst', action='store_true', help='exit once the queue is empty')
+
+    enqueue = commands.add_parser('enqueue', help='add a job to the queue')
+    enqueue.add_argument('name')
+    enqueue.add_argument('--payload', type=json.loads, default=None, help='JSON object of task arguments')
+    enqueue.add_argument('--priority', type=int, default=0)
+    enqueue.add_argument('--delay', type=float, default=0.0, help='seconds before the job becomes runnable')
+    enqueue.add_argument('--max-attempts', type=int, default=3)
+
+    commands.add_parser('stats', help='count jobs by status')
+    commands.add_parser('dead', help='list dead-lettered jobs')
+
+    retry = commands.add_parser('retry-dead', help='requeue dead-lettered jobs')
+    retry.add_argument('--id', type=int, default=None)
+
+    bench = commands.add_parser('bench', help='measure queue throughput on a scratch database')
+    bench.add_argument('-n', '--jobs', type=int, default=10000)
+    bench.add_argument('-c', '--concurrency', type=int, default=4)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(processName)s %(levelname)s %(message)s')
+
+    if args.command == 'bench':
+        from jobs import benchmark
+        benchmark.run(args.jobs, args.concurrency)
+        return
+
+    setup_django()
+    from django.conf import settings
+
+    if args.command == 'run':
+        from jobs.worker import Worker
+        concurrency = args.concurrency or settings.JOBS_CONCURRENCY
+        Worker(
+            settings.JOBS_DATABASE, concurrency, args.poll_interval, setup_django, args.burst,
+            on_job=close_old_connections,
+        ).run()
+        return
+
+    queue = get_queue()
+    if args.command == 'enqueue':
+        job_id = queue.enqueue(args.name, args.payload, args.priority, args.delay, args.max_attempts)
+        print(f'Enqueued job {job_id}')
+    elif args.command == 'stats':
+        print(json.dumps(queue.stats()))
+    elif args.command == 'dead':
+        for job_id, name, payload, attempts, error in queue.dead():
+            print(f'#{job_id} {name} {payload} attempts={attempts}\n{error}')
+    elif args.command == 'retry-dead':
+        print(f'Requeued {queue.retry_dead(args.id)} job(s)')
+    queue.close()
+
+
+if __name__ == '__main__':
+    main()